@@ -16,16 +16,18 @@ import io
 import json
 import random
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from textwrap import shorten
+
+from collections import namedtuple
 
 import streamlit as st
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.utils import ImageReader
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# reportlab is imported lazily inside the PDF/font helpers: Streamlit
+# re-executes this module on every widget interaction, and sessions that never
+# generate a PDF never pay for loading it.
 
 # Optional libs
 try:
@@ -40,122 +42,191 @@ PAGE_MARGIN_MM = 18
 DEFAULT_HOTEL_NAME = "NEO ROBOTIC INN"
 DEFAULT_GST_PERCENT = 5.0
 
+# Precompiled patterns for the Gemini response parsers (compiled once at
+# import instead of on every call)
+_RE_ADDR_JSON = re.compile(r"(\{\s*\"address\"\s*:\s*\".*?\"\s*\})", re.S)
+_RE_HOTEL_JSON = re.compile(r"(\[\s*\{.*?\}\s*\])", re.S)
+_RE_CITY_JSON = re.compile(r"\{.*\}", re.S)
+_RE_STRIP_LEFT = re.compile(r"^[\"'\[\{]+")
+_RE_STRIP_RIGHT = re.compile(r"[\"'\]\}]+$")
+# One pass per "Hotel Name - INR 3,000 - +91-xxxxx" fallback line: name,
+# price and optional phone come out of a single scan. Gaps use [^\S\n]
+# (whitespace minus newline) so no field ever bleeds into the next line.
+_RE_HOTEL_LINE = re.compile(
+    r"^(?P<name>[^-–—\n]+)[-–—][^\S\n]*(?:INR[^\S\n]*)?(?P<price>[\d,]+(?:\.\d+)?)"
+    r"[^\S\n]*(?:[-–—][^\S\n]*(?P<phone>\+?\d[\d\- \t]{7,}\d))?",
+    re.M,
+)
+
+_RE_DIGIT = re.compile(r"\d")
+
+# Tokens that make a Gemini output line look like a street address
+_ADDR_TOKENS = ("road", "rd", "street", "st", "lane", "drive", "ave", "park", "complex", "colaba")
+
+_ALPHA = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_DIGITS = "0123456789"
+
+# Lightweight hotel record — cheaper than a dict per suggestion
+Hotel = namedtuple("Hotel", "name price phone")
+
+# Fallback addresses per city, built once at import (tuples, not lists, so
+# nothing is reallocated per lookup)
+_CITY_ADDRESSES = {
+    "mumbai": (
+        "87 Marine Drive, Mumbai",
+        "14 Bandra Kurla Complex, Mumbai",
+        "5 Colaba Causeway, Mumbai",
+        "210 Andheri East, Mumbai",
+    ),
+    "delhi": (
+        "32 Connaught Place, New Delhi",
+        "108 Lajpat Nagar, New Delhi",
+        "9 Patel Nagar, New Delhi",
+        "256 INA Colony, New Delhi",
+    ),
+    "bangalore": (
+        "18 MG Road, Bengaluru",
+        "45 Indiranagar, Bengaluru",
+        "7 Whitefield Main Road, Bengaluru",
+        "88 Koramangala, Bengaluru",
+    ),
+    "hyderabad": (
+        "12 Banjara Hills, Hyderabad",
+        "56 Hitech City Rd, Hyderabad",
+        "3 Secunderabad Rd, Hyderabad",
+    ),
+    "chennai": (
+        "77 T Nagar, Chennai",
+        "21 Anna Salai, Chennai",
+        "9 Adyar, Chennai",
+    ),
+    "kolkata": (
+        "15 Park Street, Kolkata",
+        "88 Salt Lake, Kolkata",
+        "22 Ballygunge, Kolkata",
+    ),
+    "pune": (
+        "11 FC Road, Pune",
+        "60 Koregaon Park, Pune",
+        "9 Viman Nagar, Pune",
+    ),
+    "indore": (
+        "18 MG Road, Indore",
+        "44 Vijay Nagar, Indore",
+        "5 AB Road, Indore",
+    ),
+}
+_CITY_KEYS = tuple(_CITY_ADDRESSES.keys())
+_STREET_NAMES = ("Park Lane", "Circuit Avenue", "Industrial Area", "MG Road", "Market Street", "Station Road")
+_FALLBACK_HOTEL_NAMES = ("Grand Plaza", "Mirage Residency", "Sunset Suites", "City Comfort", "Hotel Aurora", "Royal Stay")
+
 # ---------- Helpers (same logic as your script) ----------
 def rand_gst_number():
-    state = f"{random.randint(1,35):02d}"
-    pan = ''.join(random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(5)) + \
-          ''.join(random.choice("0123456789") for _ in range(4)) + \
-          random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
-    return state + pan + str(random.randint(1,9)) + "Z" + random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+    letters = random.choices(_ALPHA, k=5)
+    digits = random.choices(_DIGITS, k=4)
+    return (f"{random.randint(1,35):02d}{''.join(letters)}{''.join(digits)}"
+            f"{random.choice(_ALPHA)}{random.randint(1,9)}Z{random.choice(_ALPHA)}")
 
 def rand_mobile():
     return f"+91-{random.randint(600,999)}{random.randint(1000000,9999999)}"
 
-def money(x, symbol='₹'):
-    return f"{symbol}{x:,.2f}"
+def _trunc(s, n=50):
+    """Cap a description at n chars with a plain slice — textwrap.shorten's
+    word-boundary handling is overkill for short line items."""
+    return s if len(s) <= n else s[:n - 3] + "..."
+
+def make_money(symbol='₹'):
+    """Return a formatter bound to one currency symbol, e.g. make_money('₹')(1234.5) -> '₹1,234.50'."""
+    return (symbol + "{:,.2f}").format
 
 def get_random_address(city: str) -> str:
     if not city:
         return "12 Circuit Avenue, Tech Park, City"
     c = city.strip().lower()
-    city_addresses = {
-        "mumbai": [
-            "87 Marine Drive, Mumbai",
-            "14 Bandra Kurla Complex, Mumbai",
-            "5 Colaba Causeway, Mumbai",
-            "210 Andheri East, Mumbai"
-        ],
-        "delhi": [
-            "32 Connaught Place, New Delhi",
-            "108 Lajpat Nagar, New Delhi",
-            "9 Patel Nagar, New Delhi",
-            "256 INA Colony, New Delhi"
-        ],
-        "bangalore": [
-            "18 MG Road, Bengaluru",
-            "45 Indiranagar, Bengaluru",
-            "7 Whitefield Main Road, Bengaluru",
-            "88 Koramangala, Bengaluru"
-        ],
-        "hyderabad": [
-            "12 Banjara Hills, Hyderabad",
-            "56 Hitech City Rd, Hyderabad",
-            "3 Secunderabad Rd, Hyderabad"
-        ],
-        "chennai": [
-            "77 T Nagar, Chennai",
-            "21 Anna Salai, Chennai",
-            "9 Adyar, Chennai"
-        ],
-        "kolkata": [
-            "15 Park Street, Kolkata",
-            "88 Salt Lake, Kolkata",
-            "22 Ballygunge, Kolkata"
-        ],
-        "pune": [
-            "11 FC Road, Pune",
-            "60 Koregaon Park, Pune",
-            "9 Viman Nagar, Pune"
-        ],
-        "indore": [
-            "18 MG Road, Indore",
-            "44 Vijay Nagar, Indore",
-            "5 AB Road, Indore"
-        ],
-    }
-    if c in city_addresses:
-        return random.choice(city_addresses[c])
-    for key in city_addresses:
+    entries = _CITY_ADDRESSES.get(c)
+    if entries:
+        return random.choice(entries)
+    for key in _CITY_KEYS:
         if c.startswith(key):
-            return random.choice(city_addresses[key])
+            return random.choice(_CITY_ADDRESSES[key])
     street_num = random.randint(1, 300)
-    street_names = ["Park Lane", "Circuit Avenue", "Industrial Area", "MG Road", "Market Street", "Station Road"]
-    street = random.choice(street_names)
+    street = random.choice(_STREET_NAMES)
     return f"{street_num} {street}, {city.title()}"
 
-# Attempt to fetch a short address using Gemini (if available)
-def call_gemini_for_address(city, api_key_env="GEMINI_API_KEY", debug=False):
-    api_key = os.environ.get(api_key_env)
-    if not api_key:
-        if debug:
-            st.info("GEMINI_API_KEY not set in environment.")
-        return None
-
+# Memoized Gemini SDK resolution: a missing SDK raises ImportError on every
+# attempt otherwise, so resolve once and remember the outcome.
+_GENAI = None
+_GENAI_TRIED = False
+
+def _has_generate_api(mod):
+    """True if mod exposes the configure + generate/generate_text API the
+    raw fetchers call (google-genai imports fine but only offers Client)."""
+    return hasattr(mod, "configure") and (hasattr(mod, "generate") or hasattr(mod, "generate_text"))
+
+def _get_genai():
+    """Return the first Gemini SDK module with a usable generate API, or
+    None. The result (including failure) is cached so repeat calls skip the
+    import machinery."""
+    global _GENAI, _GENAI_TRIED
+    if _GENAI_TRIED:
+        return _GENAI
+    _GENAI_TRIED = True
+    try:
+        import google.genai as genai  # type: ignore
+    except Exception:
+        genai = None
+    if genai is not None and _has_generate_api(genai):
+        _GENAI = genai
+        return _GENAI
+    try:
+        import google.generativeai as genai2  # type: ignore
+    except Exception:
+        genai2 = None
+    if genai2 is not None and _has_generate_api(genai2):
+        _GENAI = genai2
+    return _GENAI
+
+# Cached raw Gemini fetch for addresses: identical cities within the TTL are
+# served from Streamlit's cache instead of a fresh network round-trip.
+@st.cache_data(ttl=3600, show_spinner=False)
+def _gemini_address_raw(city):
+    """Fetch raw Gemini output for an address lookup. Raises on SDK or
+    network failure so st.cache_data only ever stores successful responses."""
+    api_key = os.environ.get("GEMINI_API_KEY")
     prompt = (
         f"Provide a single plausible street address (one short line) for a hotel in {city}.\n"
         "Return ONLY a short single-line address string or a JSON object like {\"address\": \"...\"}.\n"
         "If you cannot provide JSON, just output the address line."
     )
 
-    raw_text = None
-    tried_any = False
+    mod = _get_genai()
+    if mod is None:
+        raise RuntimeError("No Gemini SDK available in environment.")
 
-    # Try google.genai
-    try:
-        import google.genai as genai  # type: ignore
-        tried_any = True
-        genai.configure(api_key=api_key)
-        resp = genai.generate(model="gpt-4o-mini-1", prompt=prompt)
-        raw_text = getattr(resp, "text", None) or str(resp)
-    except Exception as e:
+    mod.configure(api_key=api_key)
+    generate = getattr(mod, "generate", None) or mod.generate_text
+    resp = generate(model="gpt-4o-mini-1", prompt=prompt)
+    return getattr(resp, "text", None) or str(resp)
+
+# Attempt to fetch a short address using Gemini (if available)
+def call_gemini_for_address(city, api_key=None, debug=False):
+    if not api_key:
         if debug:
-            st.write("google-genai failed:", e)
+            st.info("GEMINI_API_KEY not set in environment.")
+        return None
 
-    # Try google.generativeai
-    if raw_text is None:
-        try:
-            import google.generativeai as genai2  # type: ignore
-            tried_any = True
-            genai2.configure(api_key=api_key)
-            resp = genai2.generate_text(model="gpt-4o-mini-1", prompt=prompt)
-            raw_text = getattr(resp, "text", None) or str(resp)
-        except Exception as e:
-            if debug:
-                st.write("google-generativeai failed:", e)
+    # session_state fallback cache, survives across Streamlit cache evictions
+    addr_cache = st.session_state.setdefault("_addr_cache", {})
+    if city in addr_cache:
+        return addr_cache[city]
 
-    if not tried_any:
+    # transient failures raise out of the raw fetcher and are not cached,
+    # so the next submit retries
+    try:
+        raw_text = _gemini_address_raw(city)
+    except Exception as e:
         if debug:
-            st.write("No Gemini SDK available in environment.")
+            st.write(f"Gemini address fetch failed: {e}")
         return None
 
     if not raw_text:
@@ -163,12 +234,13 @@ def call_gemini_for_address(city, api_key_env="GEMINI_API_KEY", debug=False):
 
     # Try JSON extraction
     try:
-        m = re.search(r"(\{\s*\"address\"\s*:\s*\".*?\"\s*\})", raw_text, re.S)
+        m = _RE_ADDR_JSON.search(raw_text)
         if m:
             js = json.loads(m.group(1))
             addr = js.get("address")
             if addr:
-                return addr.strip()
+                addr_cache[city] = addr.strip()
+                return addr_cache[city]
     except Exception:
         if debug:
             st.write("JSON parse for address failed.")
@@ -178,57 +250,64 @@ def call_gemini_for_address(city, api_key_env="GEMINI_API_KEY", debug=False):
         line = line.strip()
         if not line:
             continue
-        line = re.sub(r"^[\"'\[\{]+", "", line)
-        line = re.sub(r"[\"'\]\}]+$", "", line)
-        if re.search(r"\d", line) or any(tok in line.lower() for tok in ["road", "rd", "street", "st", "lane", "drive", "ave", "park", "complex", "colaba"]):
+        line = _RE_STRIP_LEFT.sub("", line)
+        line = _RE_STRIP_RIGHT.sub("", line)
+        # lowercase once per line; the digit check still short-circuits the
+        # token scan
+        ll = line.lower()
+        if _RE_DIGIT.search(line) or any(tok in ll for tok in _ADDR_TOKENS):
+            addr_cache[city] = line
             return line
         if len(line) < 120:
+            addr_cache[city] = line
             return line
 
     return None
 
-# Hotel search helper using Gemini (returns list of hotels with phone)
-def call_gemini_hotel_search(city, min_price, max_price, api_key_env="GEMINI_API_KEY", debug=False):
-    api_key = os.environ.get(api_key_env)
-    if not api_key:
-        if debug:
-            st.write("call_gemini_hotel_search: GEMINI_API_KEY not set.")
-        return None
-
+# Cached raw Gemini fetch for hotel search. Prices are pre-bucketed by the
+# caller so semantically-equivalent bill amounts share a cache entry.
+@st.cache_data(ttl=3600, show_spinner=False)
+def _gemini_hotels_raw(city, min_price, max_price):
+    """Fetch raw Gemini output for a hotel search. Raises on SDK or network
+    failure so st.cache_data only ever stores successful responses."""
+    api_key = os.environ.get("GEMINI_API_KEY")
     prompt = (
         f"List up to 5 hotels in {city} with nightly price around INR {min_price}-{max_price}. "
         "Return a JSON array of objects with fields: name, approx_price, phone. "
         "If you cannot return JSON, output lines like: Hotel Name - INR 3,000 - +91-xxxxx."
     )
 
-    tried_any = False
-    raw_text = None
+    mod = _get_genai()
+    if mod is None:
+        raise RuntimeError("No Gemini SDK available in environment.")
 
-    try:
-        import google.genai as genai  # type: ignore
-        tried_any = True
-        genai.configure(api_key=api_key)
-        resp = genai.generate(model="gpt-4o-mini-1", prompt=prompt)
-        raw_text = getattr(resp, "text", None) or str(resp)
-    except Exception:
-        pass
+    mod.configure(api_key=api_key)
+    generate = getattr(mod, "generate", None) or mod.generate_text
+    resp = generate(model="gpt-4o-mini-1", prompt=prompt)
+    return getattr(resp, "text", None) or str(resp)
 
-    if raw_text is None:
-        try:
-            import google.generativeai as genai2  # type: ignore
-            tried_any = True
-            genai2.configure(api_key=api_key)
-            resp = genai2.generate_text(model="gpt-4o-mini-1", prompt=prompt)
-            raw_text = getattr(resp, "text", None) or str(resp)
-        except Exception:
-            pass
+# Hotel search helper using Gemini (returns list of hotels with phone)
+def call_gemini_hotel_search(city, min_price, max_price, api_key=None, debug=False):
+    if not api_key:
+        if debug:
+            st.write("call_gemini_hotel_search: GEMINI_API_KEY not set.")
+        return None
+
+    # Round prices to 500-INR buckets so nearby bill amounts hit the same
+    # cached entry instead of issuing a fresh request.
+    min_price = int(round(min_price / 500.0)) * 500
+    max_price = max(min_price + 500, int(round(max_price / 500.0)) * 500)
 
-    if not tried_any:
+    try:
+        raw_text = _gemini_hotels_raw(city, min_price, max_price)
+    except Exception as e:
+        if debug:
+            st.write(f"Gemini hotel fetch failed: {e}")
         return None
 
     # extract JSON or parse lines
     try:
-        m = re.search(r"(\[\s*\{.*?\}\s*\])", raw_text, re.S)
+        m = _RE_HOTEL_JSON.search(raw_text)
         if m:
             parsed = json.loads(m.group(1))
             hotels = []
@@ -236,55 +315,140 @@ def call_gemini_hotel_search(city, min_price, max_price, api_key_env="GEMINI_API
                 name = h.get("name", "<unknown>")
                 price = float(h.get("approx_price", 0) or h.get("price", 0))
                 phone = h.get("phone") or rand_mobile()
-                hotels.append({"name": name, "price": price, "phone": phone})
+                hotels.append(Hotel(name, price, phone))
             if hotels:
                 return hotels
     except Exception:
         pass
 
     hotels = []
-    for line in (raw_text or "").splitlines():
-        line = line.strip()
-        if not line:
+    for m in _RE_HOTEL_LINE.finditer(raw_text or ""):
+        name = m.group("name").strip()
+        price = float(m.group("price").replace(",", ""))
+        phone = m.group("phone")
+        hotels.append(Hotel(name, price, phone.strip() if phone else rand_mobile()))
+        if len(hotels) == 5:
+            break
+    return hotels if hotels else None
+
+# Combined raw fetch: one round-trip answers both the address lookup and the
+# hotel search instead of two sequential Gemini calls.
+@st.cache_data(ttl=3600, show_spinner=False)
+def _gemini_city_info_raw(city, min_price, max_price):
+    """Fetch raw Gemini output for the combined address + hotel lookup.
+    Raises on SDK or network failure so only successful responses are cached."""
+    api_key = os.environ.get("GEMINI_API_KEY")
+    prompt = (
+        f"For the city {city}, return ONE JSON object with two fields:\n"
+        f"\"address\": a single plausible street address line for a hotel in {city},\n"
+        f"\"hotels\": an array of up to 5 hotels in {city} with nightly price around "
+        f"INR {min_price}-{max_price}, each an object with fields: name, approx_price, phone.\n"
+        "Return ONLY the JSON object."
+    )
+
+    mod = _get_genai()
+    if mod is None:
+        raise RuntimeError("No Gemini SDK available in environment.")
+
+    mod.configure(api_key=api_key)
+    generate = getattr(mod, "generate", None) or mod.generate_text
+    resp = generate(model="gpt-4o-mini-1", prompt=prompt)
+    return getattr(resp, "text", None) or str(resp)
+
+# Batched address + hotel lookup: returns (address, hotels) or None
+def call_gemini_city_info(city, min_price, max_price, api_key=None, debug=False):
+    if not api_key:
+        if debug:
+            st.write("call_gemini_city_info: GEMINI_API_KEY not set.")
+        return None
+
+    # same 500-INR price bucketing as call_gemini_hotel_search
+    min_price = int(round(min_price / 500.0)) * 500
+    max_price = max(min_price + 500, int(round(max_price / 500.0)) * 500)
+
+    try:
+        raw_text = _gemini_city_info_raw(city, min_price, max_price)
+    except Exception as e:
+        if debug:
+            st.write(f"Gemini city info fetch failed: {e}")
+        return None
+
+    if not raw_text:
+        return None
+
+    try:
+        m = _RE_CITY_JSON.search(raw_text)
+        if not m:
+            return None
+        js = json.loads(m.group(0))
+    except Exception:
+        if debug:
+            st.write("JSON parse for city info failed.")
+        return None
+
+    addr = (js.get("address") or "").strip() or None
+    hotels = []
+    for h in js.get("hotels") or []:
+        # skip malformed entries (e.g. comma-formatted prices that survive
+        # the strip) instead of losing the whole response
+        try:
+            name = h.get("name", "<unknown>")
+            price = float(str(h.get("approx_price", 0) or h.get("price", 0) or 0).replace(",", ""))
+            phone = h.get("phone") or rand_mobile()
+        except Exception:
             continue
-        parts = re.split(r"[-–—]", line)
-        if len(parts) >= 2:
-            name = parts[0].strip()
-            price_match = re.search(r"([\d,]+(?:\.\d+)?)", parts[1])
-            price = float(price_match.group(1).replace(",", "")) if price_match else 0.0
-            phone = None
-            phone_match = re.search(r"(\+?\d[\d\-\s]{7,}\d)", line)
-            if phone_match:
-                phone = phone_match.group(1).strip()
-            hotels.append({"name": name, "price": price, "phone": phone or rand_mobile()})
-    return hotels[:5] if hotels else None
+        hotels.append(Hotel(name, price, phone))
+    if addr:
+        st.session_state.setdefault("_addr_cache", {})[city] = addr
+    if not addr and not hotels:
+        return None
+    return addr, (hotels or None)
+
+# Run a Gemini helper on a worker thread with the submitting session's
+# script-run context attached, so its st.session_state and cache access
+# resolve to the right session instead of Streamlit's threadless mock.
+def _run_with_ctx(ctx, fn, *args):
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return fn(*args)
 
 def fallback_hotel_suggestions(city, bill_amount):
-    names = ["Grand Plaza", "Mirage Residency", "Sunset Suites", "City Comfort", "Hotel Aurora", "Royal Stay"]
+    city_tag = city.split()[0].title()
     out = []
     for i in range(3):
-        name = f"{random.choice(names)} {city.split()[0].title()}"
-        delta = bill_amount * random.uniform(-0.2, 0.2)
-        price = max(500, round(bill_amount + delta, 2))
+        name = f"{random.choice(_FALLBACK_HOTEL_NAMES)} {city_tag}"
+        # integer percent jitter instead of a float draw + round; money()
+        # formats to 2dp downstream anyway
+        pct = random.randint(-20, 20)
+        price = max(500.0, bill_amount + bill_amount * pct / 100.0)
         phone = rand_mobile()
-        out.append({"name": name, "price": price, "phone": phone})
+        out.append(Hotel(name, price, phone))
     return out
 
+# Decode an uploaded logo once per unique image (keyed on the bytes hash);
+# repeated "Generate" clicks with the same logo skip the PIL decode.
+@st.cache_resource(show_spinner=False)
+def _prepare_logo(logo_bytes):
+    """Return (ImageReader, width, height) for the given image bytes."""
+    from reportlab.lib.utils import ImageReader
+
+    img = ImageReader(io.BytesIO(logo_bytes))
+    iw, ih = img.getSize()
+    return img, iw, ih
+
 # Register uploaded TTF to reportlab (returns font name)
-def register_font_from_bytes(ttf_bytes, filename_hint="uploaded_font.ttf"):
-    path = os.path.join(".", f".tmp_font_{random.randint(1000,9999)}_{filename_hint}")
-    with open(path, "wb") as f:
-        f.write(ttf_bytes)
-    name = os.path.splitext(os.path.basename(path))[0]
-    try:
-        pdfmetrics.registerFont(TTFont(name, path))
-        return name, path
-    except Exception:
-        try:
-            os.remove(path)
-        except Exception:
-            pass
-        raise
+@st.cache_resource(show_spinner=False)
+def register_font_from_bytes(ttf_bytes):
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    # name derived from the font bytes: no path juggling, and re-registering
+    # the same font on a later rerun becomes a no-op
+    name = f"font_{hash(ttf_bytes) & 0xffffffff:x}"
+    if name in pdfmetrics.getRegisteredFontNames():
+        return name
+    # TTFont accepts a file-like object, so the font never touches disk
+    pdfmetrics.registerFont(TTFont(name, io.BytesIO(ttf_bytes)))
+    return name
 
 # ---------- PDF generator: writes to bytes ----------
 def create_pdf_bytes(hotel_name, hotel_addr, guest_name, invoice_no, date_str, room_no,
@@ -294,9 +458,18 @@ def create_pdf_bytes(hotel_name, hotel_addr, guest_name, invoice_no, date_str, r
     Generate PDF into bytes and return bytes buffer.
     Width is reduced by 30% (content = 70% of printable width) and centered.
     """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+
     w, h = A4
     margin = PAGE_MARGIN_MM * mm
-    buf = io.BytesIO()
+    money = make_money(currency)
+    # seed the buffer at 32KB (a typical invoice is 5-20KB) so reportlab's
+    # writes land in one allocation instead of growing it repeatedly; the
+    # unused tail is trimmed after save
+    buf = io.BytesIO(bytes(32 * 1024))
     c = canvas.Canvas(buf, pagesize=A4)
 
     # compute reduced centered area (content = 70% of printable width)
@@ -316,16 +489,22 @@ def create_pdf_bytes(hotel_name, hotel_addr, guest_name, invoice_no, date_str, r
     top_y = 0
     if logo_file is not None:
         try:
-            # logo_file may be an UploadedFile or bytes
+            # logo_file may be an UploadedFile, bytes, or anything
+            # ImageReader accepts (e.g. a filesystem path)
             if hasattr(logo_file, "read"):
                 logo_bytes = logo_file.read()
-                logo_stream = io.BytesIO(logo_bytes)
             elif isinstance(logo_file, (bytes, bytearray)):
-                logo_stream = io.BytesIO(logo_file)
+                logo_bytes = bytes(logo_file)
             else:
-                logo_stream = logo_file
-            img = ImageReader(logo_stream)
-            iw, ih = img.getSize()
+                logo_bytes = None
+            if logo_bytes is not None:
+                img, iw, ih = _prepare_logo(logo_bytes)
+            else:
+                # passthrough: let ImageReader handle it directly, uncached
+                from reportlab.lib.utils import ImageReader
+
+                img = ImageReader(logo_file)
+                iw, ih = img.getSize()
             logo_w = 40 * mm
             logo_h = (logo_w / iw) * ih
             c.drawImage(img, 0, -logo_h, width=logo_w, height=logo_h, preserveAspectRatio=True, mask='auto')
@@ -386,27 +565,46 @@ def create_pdf_bytes(hotel_name, hotel_addr, guest_name, invoice_no, date_str, r
     c.line(0, y, content_width, y)
     y -= 14
 
-    subtotal = 0.0
     desc_max_chars = 50
-    for i, it in enumerate(items, start=1):
-        qty = int(it.get("qty", 1))
-        rate = float(it.get("rate", 0.0))
+    # normalize rows once up front: the per-row dict lookups and description
+    # truncation move out of the render loop, and the subtotal is known
+    # before anything is drawn
+    items_norm = [
+        (int(it.get("qty", 1)), float(it.get("rate", 0.0)),
+         _trunc(str(it.get("desc", "")), desc_max_chars))
+        for it in items
+    ]
+    subtotal = sum(qty * rate for qty, rate, _ in items_norm)
+    # one TextObject per page batches every row into a single BT/ET block
+    # instead of a drawString text block per cell
+    t = c.beginText(col_sl_x, y)
+    t.setFont(regular_font, 10)
+    for i, (qty, rate, desc) in enumerate(items_norm, start=1):
         amount = qty * rate
-        subtotal += amount
-
-        c.setFont(regular_font, 10)
-        c.drawString(col_sl_x, y, str(i))
-        desc = shorten(str(it.get("desc", "")), width=desc_max_chars, placeholder="...")
-        c.drawString(col_desc_x, y, desc)
-        c.drawRightString(col_qty_right, y, str(qty))
-        c.drawRightString(col_rate_right, y, money(rate, currency))
-        c.drawRightString(col_amount_right, y, money(amount, currency))
+        qty_s = str(qty)
+        rate_s = money(rate)
+        amount_s = money(amount)
+        t.setTextOrigin(col_sl_x, y)
+        t.textOut(str(i))
+        t.setTextOrigin(col_desc_x, y)
+        t.textOut(desc)
+        # right-align numeric columns against their column edge
+        t.setTextOrigin(col_qty_right - stringWidth(qty_s, regular_font, 10), y)
+        t.textOut(qty_s)
+        t.setTextOrigin(col_rate_right - stringWidth(rate_s, regular_font, 10), y)
+        t.textOut(rate_s)
+        t.setTextOrigin(col_amount_right - stringWidth(amount_s, regular_font, 10), y)
+        t.textOut(amount_s)
 
         y -= 16
         if y < -500:
+            c.drawText(t)
             c.showPage()
             c.translate(left_offset, top_y_origin)
             y = -40
+            t = c.beginText(col_sl_x, y)
+            t.setFont(regular_font, 10)
+    c.drawText(t)
 
     # totals
     gst_amount = round(subtotal * gst_percent / 100.0, 2)
@@ -415,11 +613,11 @@ def create_pdf_bytes(hotel_name, hotel_addr, guest_name, invoice_no, date_str, r
     c.line(0, y, content_width, y)
     y -= 16
     c.setFont(header_font, 10)
-    c.drawRightString(content_width, y, f"Subtotal: {money(subtotal, currency)}")
+    c.drawRightString(content_width, y, f"Subtotal: {money(subtotal)}")
     y -= 14
-    c.drawRightString(content_width, y, f"GST ({gst_percent}%): {money(gst_amount, currency)}")
+    c.drawRightString(content_width, y, f"GST ({gst_percent}%): {money(gst_amount)}")
     y -= 14
-    c.drawRightString(content_width, y, f"Grand Total: {money(grand_total, currency)}")
+    c.drawRightString(content_width, y, f"Grand Total: {money(grand_total)}")
 
     y -= 26
     c.setFont(regular_font, 9)
@@ -428,8 +626,10 @@ def create_pdf_bytes(hotel_name, hotel_addr, guest_name, invoice_no, date_str, r
     c.drawString(0, y, "Note: This is a computer-generated bill.")
 
     c.save()
-    buf.seek(0)
-    return buf.read()
+    # drop preallocated slack past the written PDF, then getvalue() copies
+    # straight out of the internal buffer — no second seek+read copy
+    buf.truncate()
+    return buf.getvalue()
 
 # ---------- Streamlit UI ----------
 st.set_page_config(page_title="Hotel Bill Generator", layout="centered")
@@ -478,57 +678,93 @@ with st.form("bill_form"):
 if submitted:
     # register font if uploaded
     font_name = None
-    font_tmp_path = None
     if font_file is not None:
         try:
             font_bytes = font_file.read()
-            font_name, font_tmp_path = register_font_from_bytes(font_bytes, font_file.name)
+            font_name = register_font_from_bytes(font_bytes)
             st.success(f"Registered font: {font_name}")
         except Exception as e:
             st.error(f"Could not register font: {e}")
             font_name = None
 
-    # get address via Gemini or fallback
+    # hotel phone: if user provided, use it, else pick from Gemini suggestions or random
+    hotel_phone = hotel_phone_input.strip() or None
+
+    # get address (and hotels, when a phone is needed) via Gemini or fallback
     addr = None
-    if (not force_fallback) and os.environ.get("GEMINI_API_KEY"):
-        try:
-            addr = call_gemini_for_address(city, api_key_env="GEMINI_API_KEY", debug=debug)
-            if debug:
-                st.write("Gemini address result:", addr)
-        except Exception as e:
-            if debug:
-                st.write("call_gemini_for_address error:", e)
-            addr = None
+    hotels = None
+    # look the key up once per submit; the helpers just receive it
+    gemini_key = None if force_fallback else os.environ.get("GEMINI_API_KEY")
+    if gemini_key:
+        low = max(100, int(bill_amount * 0.8))
+        high = int(bill_amount * 1.2)
+        with st.spinner("Contacting Gemini..."):
+            if not hotel_phone:
+                # one combined round-trip covers both lookups
+                try:
+                    info = call_gemini_city_info(city, low, high, api_key=gemini_key, debug=debug)
+                    if info:
+                        addr, hotels = info
+                    if debug:
+                        st.write("Gemini city info result:", info)
+                except Exception as e:
+                    if debug:
+                        st.write("call_gemini_city_info error:", e)
+            # fall back to the separate calls for whatever is still missing;
+            # when both are needed they run in parallel — the calls are
+            # network-bound, so wall clock drops from sum to max of the two
+            need_addr = not addr
+            need_hotels = not hotels and not hotel_phone
+            if need_addr and need_hotels and not debug:
+                ctx = get_script_run_ctx()
+                with ThreadPoolExecutor(max_workers=2) as ex:
+                    f_addr = ex.submit(_run_with_ctx, ctx, call_gemini_for_address, city, gemini_key)
+                    f_hot = ex.submit(_run_with_ctx, ctx, call_gemini_hotel_search, city, low, high, gemini_key)
+                    try:
+                        addr = f_addr.result()
+                    except Exception:
+                        addr = None
+                    try:
+                        hotels = f_hot.result()
+                    except Exception:
+                        hotels = None
+            else:
+                # sequential path keeps debug output attached to the script thread
+                if need_addr:
+                    try:
+                        addr = call_gemini_for_address(city, api_key=gemini_key, debug=debug)
+                        if debug:
+                            st.write("Gemini address result:", addr)
+                    except Exception as e:
+                        if debug:
+                            st.write("call_gemini_for_address error:", e)
+                        addr = None
+                if need_hotels:
+                    try:
+                        hotels = call_gemini_hotel_search(city, low, high, api_key=gemini_key, debug=debug)
+                        if debug:
+                            st.write("Gemini hotel search result:", hotels)
+                    except Exception as e:
+                        if debug:
+                            st.write("call_gemini_hotel_search error:", e)
+                        hotels = None
     if not addr:
         addr = get_random_address(city)
-    # hotel phone: if user provided, use it, else pick from Gemini suggestions or random
-    hotel_phone = hotel_phone_input.strip() or None
 
-    # attempt to get hotels via Gemini to fill phone (internal), fallback if needed
     chosen_phone = None
     if not hotel_phone:
-        hotels = None
-        if not force_fallback and os.environ.get("GEMINI_API_KEY"):
-            try:
-                low = max(100, int(bill_amount * 0.8))
-                high = int(bill_amount * 1.2)
-                hotels = call_gemini_hotel_search(city, low, high, api_key_env="GEMINI_API_KEY", debug=debug)
-                if debug:
-                    st.write("Gemini hotel search result:", hotels)
-            except Exception as e:
-                if debug:
-                    st.write("call_gemini_hotel_search error:", e)
-                hotels = None
         if not hotels:
             hotels = fallback_hotel_suggestions(city, bill_amount)
         chosen = random.choice(hotels)
-        chosen_phone = chosen.get("phone") or rand_mobile()
+        chosen_phone = chosen.phone or rand_mobile()
     hotel_phone_final = hotel_phone_input.strip() if hotel_phone_input.strip() else (chosen_phone or rand_mobile())
 
     gst_no = rand_gst_number()
     payment_mode = "Cash"
 
-    # generate PDF bytes
+    # generate PDF bytes (read logo bytes once so the decoded image can be
+    # cached across reruns)
+    logo_bytes = hotel_logo.read() if hotel_logo is not None else None
     try:
         pdf_bytes = create_pdf_bytes(
             hotel_name=hotel_name,
@@ -543,7 +779,7 @@ if submitted:
             payment_mode=payment_mode,
             hotel_phone=hotel_phone_final,
             font_name=font_name,
-            logo_file=hotel_logo
+            logo_file=logo_bytes
         )
     except Exception as e:
         st.error(f"Failed to generate PDF: {e}")
@@ -553,11 +789,4 @@ if submitted:
     st.success("PDF generated!")
     st.download_button("Download invoice (PDF)", data=pdf_bytes, file_name=fname, mime="application/pdf")
 
-    # cleanup tmp font file if created
-    if font_tmp_path:
-        try:
-            os.remove(font_tmp_path)
-        except Exception:
-            pass
-
 st.caption("Tip: set GEMINI_API_KEY in your environment to enable Gemini address/hotel suggestions. Use --force-fallback to skip Gemini.")